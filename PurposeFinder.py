@@ -6,20 +6,16 @@
 # - AI-driven goal statement + 3-step action plan (uses OpenAI API if available)
 # - Save results locally (JSON) and allow user to download
 # Requirements:
-# pip install streamlit openai pandas numpy
+# pip install streamlit openai numpy orjson
+# Optional: pip install numba (JIT scoring for large question banks)
 
 import streamlit as st
-import pandas as pd
-import numpy as np
-import json
-import os
+import heapq
 from datetime import datetime
 
-try:
-    import openai
-    OPENAI_AVAILABLE = True
-except Exception:
-    OPENAI_AVAILABLE = False
+from openai_helpers import (HAS_API_KEY, OPENAI_AVAILABLE, dumps, fetch_batch_results,
+                            get_openai_client, render_stream, submit_batch)
+from scoring import BIG5_FLAT, SDT_FLAT, score_likert_responses, score_sdt
 
 # ---------------------------
 # Configuration / Constants
@@ -27,35 +23,6 @@ except Exception:
 APP_TITLE = "PurposeFinder — Discover Your Life Goals"
 APP_SUBTITLE = "A gentle, psychology-backed journey to find your values, strengths, and an actionable first step."
 
-# Short Big Five items (very reduced set for MVP). Responses 1-5
-BIG5_ITEMS = {
-    'Openness': [
-        "I enjoy trying new things and new experiences.",
-        "I prefer variety over routine."],
-    'Conscientiousness': [
-        "I pay attention to details and like to be organized.",
-        "I finish tasks I start."],
-    'Extraversion': [
-        "I feel energized spending time with other people.",
-        "I enjoy being the center of attention sometimes."],
-    'Agreeableness': [
-        "I usually consider other people's feelings.",
-        "I prefer cooperation over competition."],
-    'Neuroticism': [
-        "I sometimes feel anxious or stressed.",
-        "I get upset easily by small things."]
-}
-
-# Self-Determination (autonomy, competence, relatedness) -- short prompts
-SDT_ITEMS = {
-    'Autonomy': [
-        "I have the freedom to make choices about how I spend my time."],
-    'Competence': [
-        "I feel capable of achieving goals I set for myself."],
-    'Relatedness': [
-        "I feel connected to people who care about me."]
-}
-
 # Values checklist (short list)
 VALUES = [
     'Creativity', 'Security', 'Helping others', 'Achievement', 'Freedom', 'Family', 'Adventure', 'Learning', 'Wealth', 'Stability'
@@ -70,28 +37,11 @@ DIMENSION_TO_DOMAINS = {
     'Neuroticism': ['Care-oriented roles with predictable structure', 'Focus on wellbeing, therapy, or coaching']
 }
 
+
 # ---------------------------
 # Helper functions
 # ---------------------------
 
-def score_likert_responses(responses):
-    # responses: dict of {item_text: int}
-    # For big five: average per trait
-    trait_scores = {}
-    for trait, items in BIG5_ITEMS.items():
-        vals = [responses.get(q, 3) for q in items]
-        trait_scores[trait] = np.mean(vals)
-    return trait_scores
-
-
-def score_sdt(responses):
-    sdt_scores = {}
-    for trait, items in SDT_ITEMS.items():
-        vals = [responses.get(q, 3) for q in items]
-        sdt_scores[trait] = np.mean(vals)
-    return sdt_scores
-
-
 def values_summary(chosen_values):
     if not chosen_values:
         return 'No strong values selected.'
@@ -99,15 +49,31 @@ def values_summary(chosen_values):
 
 
 def recommend_domains_from_scores(trait_scores):
-    # pick top 2 traits by score
-    sorted_traits = sorted(trait_scores.items(), key=lambda x: x[1], reverse=True)
-    top_traits = [t for t, s in sorted_traits[:2]]
+    # pick top 2 traits by score (nlargest keeps sorted()'s tie order)
+    top_traits = [t for t, s in heapq.nlargest(2, trait_scores.items(), key=lambda x: x[1])]
     domains = []
     for t in top_traits:
         domains.extend(DIMENSION_TO_DOMAINS.get(t, []))
     return domains
 
 
+# Cached wrappers: st.cache_data needs hashable args, so dicts are passed as
+# sorted item tuples. Unchanged responses skip re-scoring on every rerun.
+@st.cache_data(show_spinner=False)
+def _score_likert_cached(resp_tuple):
+    return score_likert_responses(dict(resp_tuple))
+
+
+@st.cache_data(show_spinner=False)
+def _score_sdt_cached(resp_tuple):
+    return score_sdt(dict(resp_tuple))
+
+
+@st.cache_data(show_spinner=False)
+def _recommend_domains_cached(scores_tuple):
+    return recommend_domains_from_scores(dict(scores_tuple))
+
+
 def build_ai_prompt(profile_summary):
     prompt = (
         "You are a compassionate career & life coach. Given the user's psychological profile, "
@@ -118,28 +84,29 @@ def build_ai_prompt(profile_summary):
     return prompt
 
 
-def call_openai(prompt, model='gpt-4o-mini', temperature=0.7, max_tokens=400):
+def call_openai(prompt, placeholder=None, model='gpt-4o-mini', temperature=0.7, max_tokens=400):
     # model name can be adjusted by the user; defaults to a safe value
+    # the response is streamed into `placeholder` (an st.empty()) if given
     if not OPENAI_AVAILABLE:
         raise RuntimeError('OpenAI library not installed')
-    api_key = os.getenv('OPENAI_API_KEY')
-    if not api_key:
+    if not HAS_API_KEY:
         raise RuntimeError('OPENAI_API_KEY not set')
-    openai.api_key = api_key
-    # Try ChatCompletion / chat API
+    client = get_openai_client()
+    # Chat completions API (openai>=1.0)
     try:
-        resp = openai.ChatCompletion.create(
+        resp = client.chat.completions.create(
             model=model,
             messages=[{"role": "user", "content": prompt}],
             temperature=temperature,
-            max_tokens=max_tokens
+            max_tokens=max_tokens,
+            stream=True
         )
-        text = resp['choices'][0]['message']['content'].strip()
-        return text
+        return render_stream(resp, placeholder) or None
     except Exception as e:
         st.error(f"OpenAI error: {e}")
         return None
 
+
 # ---------------------------
 # Streamlit UI
 # ---------------------------
@@ -156,71 +123,100 @@ with st.expander('About this app (method):'):
         '- Local save/export for privacy.'
     )
 
-st.header('Step 1 — Tell us a bit about yourself')
-name = st.text_input('Your name (optional)')
-age = st.number_input('Age (optional)', min_value=13, max_value=120, value=30)
-
-st.header('Step 2 — Quick personality check (choose how much each statement describes you)')
-st.write('Use 1 (Strongly disagree) — 5 (Strongly agree)')
-
-big5_responses = {}
-for trait, items in BIG5_ITEMS.items():
-    st.subheader(trait)
-    for q in items:
-        big5_responses[q] = st.slider(q, 1, 5, 3, key=q[:40])
-
-st.header('Step 3 — Intrinsic motivations (Self-Determination)')
-sdt_responses = {}
-for trait, items in SDT_ITEMS.items():
-    for q in items:
-        sdt_responses[q] = st.slider(q, 1, 5, 3, key=q[:30]+"_sdt")
-
-st.header('Step 4 — Your values')
-st.write('Select up to 4 values that matter to you:')
-selected_values = st.multiselect('Values', VALUES, default=[])[:4]
-
-st.header('Step 5 — Quick reflection')
-free_text = st.text_area('What activities make you lose track of time? (2-3 lines)')
-
-if st.button('Generate my purpose summary'):
+# A form commits all quiz widgets together on submit instead of rerunning
+# the whole script on every slider change
+with st.form('quiz_form'):
+    st.header('Step 1 — Tell us a bit about yourself')
+    name = st.text_input('Your name (optional)')
+    age = st.number_input('Age (optional)', min_value=13, max_value=120, value=30)
+
+    st.header('Step 2 — Quick personality check (choose how much each statement describes you)')
+    st.write('Use 1 (Strongly disagree) — 5 (Strongly agree)')
+
+    big5_responses = {}
+    # widget keys come prebuilt from scoring.BIG5_FLAT / SDT_FLAT
+    for qid, (trait, i, q, key) in enumerate(BIG5_FLAT):
+        if i == 0:
+            st.subheader(trait)
+        big5_responses[qid] = st.slider(q, 1, 5, 3, key=key)
+
+    st.header('Step 3 — Intrinsic motivations (Self-Determination)')
+    sdt_responses = {}
+    for qid, (trait, i, q, key) in enumerate(SDT_FLAT):
+        sdt_responses[qid] = st.slider(q, 1, 5, 3, key=key)
+
+    st.header('Step 4 — Your values')
+    st.write('Select up to 4 values that matter to you:')
+    selected_values = st.multiselect('Values', VALUES, default=[])[:4]
+
+    st.header('Step 5 — Quick reflection')
+    free_text = st.text_area('What activities make you lose track of time? (2-3 lines)')
+    queue_mode = st.checkbox('Queue AI generation for batch processing (bulk workflows, results within 24h)')
+    submitted = st.form_submit_button('Generate my purpose summary')
+
+if submitted:
     # Score
-    trait_scores = score_likert_responses(big5_responses)
-    sdt_scores = score_sdt(sdt_responses)
-    domains = recommend_domains_from_scores(trait_scores)
+    trait_scores = _score_likert_cached(tuple(sorted(big5_responses.items())))
+    sdt_scores = _score_sdt_cached(tuple(sorted(sdt_responses.items())))
+    domains = _recommend_domains_cached(tuple(trait_scores.items()))
     values_text = values_summary(selected_values)
 
     # Build profile summary
-    profile_lines = [f"Name: {name or 'Anonymous'}",
-                     f"Age: {age}",
-                     "\nBig Five scores (1-5):"]
-    for t, s in trait_scores.items():
-        profile_lines.append(f"- {t}: {s:.2f}")
-    profile_lines.append('\nSelf-determination (1-5):')
-    for t, s in sdt_scores.items():
-        profile_lines.append(f"- {t}: {s:.2f}")
-    profile_lines.append('\nTop suggested domains: ' + (', '.join(domains) if domains else 'General exploration'))
-    profile_lines.append('\nValues: ' + values_text)
-    profile_lines.append('\nActivities I love: ' + (free_text or 'Not provided'))
-
-    profile_summary = '\n'.join(profile_lines)
+    big5_lines = '\n'.join(f"- {t}: {s:.2f}" for t, s in trait_scores.items())
+    sdt_lines = '\n'.join(f"- {t}: {s:.2f}" for t, s in sdt_scores.items())
+    profile_summary = (
+        f"Name: {name or 'Anonymous'}\n"
+        f"Age: {age}\n"
+        f"\nBig Five scores (1-5):\n{big5_lines}\n"
+        f"\nSelf-determination (1-5):\n{sdt_lines}\n"
+        f"\nTop suggested domains: {', '.join(domains) if domains else 'General exploration'}\n"
+        f"\nValues: {values_text}\n"
+        f"\nActivities I love: {free_text or 'Not provided'}"
+    )
 
     st.subheader('Your profile snapshot')
     st.code(profile_summary)
 
     # AI generation (if possible)
     ai_text = None
-    if OPENAI_AVAILABLE and os.getenv('OPENAI_API_KEY'):
-        with st.spinner('Generating personalized purpose & micro-plan with AI...'):
-            prompt = build_ai_prompt(profile_summary)
+    if OPENAI_AVAILABLE and HAS_API_KEY and queue_mode:
+        # queue (label, prompt) pairs; the label becomes the batch custom_id
+        queue = st.session_state.setdefault('batch_queue', [])
+        prompt = build_ai_prompt(profile_summary)
+        if any(p == prompt for _, p in queue):
+            st.info('This profile is already queued for batch AI generation.')
+        else:
+            label = f"{name or 'Anonymous'} ({datetime.utcnow().isoformat(timespec='seconds')})"
+            queue.append((label, prompt))
+            st.info(f'Profile queued for batch AI generation as "{label}" — submit the queue below.')
+    elif OPENAI_AVAILABLE and HAS_API_KEY:
+        # Streamed output can't go through st.cache_data (the placeholder lives
+        # outside the cached function), so identical prompts are memoized per session
+        prompt = build_ai_prompt(profile_summary)
+        ai_cache = st.session_state.setdefault('ai_text_cache', {})
+        if prompt in ai_cache:
+            ai_text = ai_cache[prompt]
+            st.subheader('AI-generated purpose & micro-plan')
+            st.markdown(ai_text)
+        else:
+            # heading + streamed text share one slot so a failed call leaves nothing behind
+            ai_section = st.empty()
+            with ai_section.container():
+                st.subheader('AI-generated purpose & micro-plan')
+                ai_placeholder = st.empty()
+                # shown until the first token arrives (time-to-first-token)
+                ai_placeholder.info('Generating personalized purpose & micro-plan with AI...')
             try:
-                ai_text = call_openai(prompt)
-            except Exception as e:
+                ai_text = call_openai(prompt, placeholder=ai_placeholder)
+            except Exception:
+                pass
+            if ai_text:
+                ai_cache[prompt] = ai_text
+            else:
+                ai_section.empty()
                 st.warning('AI generation unavailable — will fall back to rule-based suggestions.')
 
-    if ai_text:
-        st.subheader('AI-generated purpose & micro-plan')
-        st.markdown(ai_text)
-    else:
+    if not ai_text:
         st.subheader('Suggested purpose & starter goals (rule-based fallback)')
         st.write('Purpose (example):')
         # create a small purpose sentence from top domains/values
@@ -244,8 +240,8 @@ if st.button('Generate my purpose summary'):
         st.write('Day 6: Look for small ways to incorporate this into your week.')
         st.write('Day 7: Review and choose a next small commitment (e.g., weekly hour).')
 
-    # Save results button
-    results = {
+    # Keep results across reruns so the download button below survives its own click
+    st.session_state['results'] = {
         'timestamp': datetime.utcnow().isoformat(),
         'name': name,
         'age': age,
@@ -256,11 +252,42 @@ if st.button('Generate my purpose summary'):
         'domains': domains,
         'ai_text': ai_text
     }
+    st.session_state['results_json'] = dumps(st.session_state['results'])
+    st.success('Done — save your results and try small experiments for 1 week!')
+
+if 'results' in st.session_state:
     st.markdown('---')
-    if st.button('Download my results (JSON)'):
-        st.download_button('Click to download', json.dumps(results, indent=2), file_name='purposefinder_results.json')
+    st.download_button('Download my results (JSON)', st.session_state['results_json'],
+                       file_name='purposefinder_results.json', mime='application/json')
 
-    st.success('Done — save your results and try small experiments for 1 week!')
+# Batch queue (bulk workflows)
+if st.session_state.get('batch_queue') or st.session_state.get('batch_ids'):
+    st.markdown('---')
+    st.subheader('Batch AI generation')
+    queue = st.session_state.get('batch_queue', [])
+    batch_ids = st.session_state.setdefault('batch_ids', [])
+    if queue and st.button(f'Submit {len(queue)} queued profile(s)'):
+        try:
+            batch_ids.append(submit_batch(queue))
+            st.session_state['batch_queue'] = []
+            st.info(f"Batch submitted: {batch_ids[-1]}")
+        except Exception as e:
+            st.error(f"Batch submission failed: {e}")
+    if batch_ids:
+        # earlier batches stay reachable after a new submission
+        batch_id = st.selectbox('Submitted batches', batch_ids, index=len(batch_ids) - 1)
+        if st.button('Check batch status'):
+            try:
+                status, batch_results, batch_errors = fetch_batch_results(batch_id)
+            except Exception as e:
+                st.error(f"Batch lookup failed: {e}")
+            else:
+                st.write(f'Status: {status}')
+                for custom_id, text in (batch_results or {}).items():
+                    st.markdown(f'**{custom_id}**')
+                    st.markdown(text)
+                for custom_id, error in (batch_errors or {}).items():
+                    st.error(f'{custom_id}: {error}')
 
 # Footer / tips
 st.markdown('---')
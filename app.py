@@ -1,16 +1,10 @@
 import streamlit as st
-import pandas as pd
-import numpy as np
-import os
-import json
-
-# Optional OpenAI integration
-try:
-    from openai import OpenAI
-    client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-    use_ai = True
-except Exception:
-    use_ai = False
+
+from openai_helpers import (HAS_API_KEY, OPENAI_AVAILABLE, dumps, fetch_batch_results,
+                            get_openai_client, render_stream, submit_batch)
+
+# Optional OpenAI integration (key and SDK availability come from openai_helpers)
+use_ai = HAS_API_KEY and OPENAI_AVAILABLE
 
 # -----------------------------
 # Helper functions
@@ -18,35 +12,41 @@ except Exception:
 def calculate_personality_score(responses):
     """Compute Big Five-like mini score."""
     traits = {
-        "Openness": np.mean([responses.get("imagination", 3), responses.get("curiosity", 3)]),
-        "Conscientiousness": np.mean([responses.get("organized", 3), responses.get("responsibility", 3)]),
-        "Extraversion": np.mean([responses.get("outgoing", 3), responses.get("energy", 3)]),
-        "Agreeableness": np.mean([responses.get("helpful", 3), responses.get("trust", 3)]),
-        "Neuroticism": np.mean([responses.get("stress", 3), responses.get("worry", 3)]),
+        "Openness": (responses.get("imagination", 3) + responses.get("curiosity", 3)) * 0.5,
+        "Conscientiousness": (responses.get("organized", 3) + responses.get("responsibility", 3)) * 0.5,
+        "Extraversion": (responses.get("outgoing", 3) + responses.get("energy", 3)) * 0.5,
+        "Agreeableness": (responses.get("helpful", 3) + responses.get("trust", 3)) * 0.5,
+        "Neuroticism": (responses.get("stress", 3) + responses.get("worry", 3)) * 0.5,
     }
     return traits
 
+@st.cache_data(show_spinner=False)
+def _score_cached(resp_tuple):
+    """Cached scoring keyed on a hashable tuple of responses."""
+    return calculate_personality_score(dict(resp_tuple))
+
+# Traits with dedicated domains, in tie-break priority order (Neuroticism has none)
+TRAIT_NAMES = ("Extraversion", "Openness", "Conscientiousness", "Agreeableness")
+DOMAINS_TABLE = {
+    "Extraversion": ["Leadership", "Social impact"],
+    "Openness": ["Creativity", "Innovation"],
+    "Conscientiousness": ["Achievement", "Structure"],
+    "Agreeableness": ["Helping", "Community"],
+    "_default": ["Balance", "Stability"],
+}
+
 def get_top_domains(traits):
-    """Recommend focus domain based on personality"""
-    if traits["Extraversion"] > 3.5:
-        return ["Leadership", "Social impact"]
-    elif traits["Openness"] > 3.5:
-        return ["Creativity", "Innovation"]
-    elif traits["Conscientiousness"] > 3.5:
-        return ["Achievement", "Structure"]
-    elif traits["Agreeableness"] > 3.5:
-        return ["Helping", "Community"]
-    else:
-        return ["Balance", "Stability"]
-
-def generate_purpose_statement(traits, values, motivations):
-    """Use AI if available, else fallback text"""
-    domains = get_top_domains(traits)
+    """Recommend focus domain based on the strongest (non-neurotic) personality trait"""
+    top = max(TRAIT_NAMES, key=traits.__getitem__)
+    if traits[top] > 3.5:
+        return DOMAINS_TABLE[top]
+    return DOMAINS_TABLE["_default"]
+
+def build_purpose_prompt(traits, values, motivations):
+    """Prompt for the AI purpose statement."""
     values_text = ", ".join(values) if values else "growth and balance"
     motive_text = ", ".join(motivations) if motivations else "inner satisfaction"
-
-    if use_ai:
-        prompt = f"""
+    return f"""
         Act as a life coach and purpose mentor.
         Based on these traits: {traits},
         core values: {values_text},
@@ -54,19 +54,46 @@ def generate_purpose_statement(traits, values, motivations):
         write a warm and concise life purpose statement (1–2 sentences)
         followed by a short 7-day micro-goal plan.
         """
+
+def generate_purpose_statement(traits, values, motivations, placeholder=None):
+    """Use AI if available (streamed into placeholder), else fallback text.
+
+    Returns (text, from_ai) so callers can avoid caching the fallback.
+    """
+    domains = get_top_domains(traits)
+    values_text = ", ".join(values) if values else "growth and balance"
+
+    if use_ai:
+        prompt = build_purpose_prompt(traits, values, motivations)
         try:
-            response = client.chat.completions.create(
+            client = get_openai_client()
+            stream = client.chat.completions.create(
                 model="gpt-4o-mini",
-                messages=[{"role": "user", "content": prompt}]
+                messages=[{"role": "user", "content": prompt}],
+                stream=True
             )
-            return response.choices[0].message.content.strip()
+            text = render_stream(stream, placeholder)
+            if text:
+                return text, True
+            st.warning("AI generation returned no text.")
         except Exception as e:
             st.warning(f"AI generation failed: {e}")
     
     # --- fallback
     purpose = f"Focus on {domains[0].lower()} while honoring your values of {values_text}."
     plan = "Start small this week: journal daily and take one step toward something that feels meaningful."
-    return purpose + "\n\n" + plan
+    return purpose + "\n\n" + plan, False
+
+def generate_purpose_statements_batch(profiles):
+    """Submit many profiles as one batch job; returns the batch id.
+
+    Each profile is a dict with "id", "traits", "values" and "motivations";
+    the profile id is used as the batch custom_id.
+    """
+    return submit_batch([
+        (str(p["id"]), build_purpose_prompt(p["traits"], p["values"], p["motivations"]))
+        for p in profiles
+    ])
 
 # -----------------------------
 # Streamlit App
@@ -129,15 +156,25 @@ motivations = st.multiselect("Your main motivators", motives)
 # Step 4: Generate Purpose
 # -----------------------------
 if st.button("✨ Discover My Purpose"):
-    traits = calculate_personality_score(responses)
-    purpose_text = generate_purpose_statement(traits, values, motivations)
+    traits = _score_cached(tuple(sorted(responses.items())))
 
     st.success("Here’s your personalized purpose insight:")
-    st.write(purpose_text)
+    # Streamed output can't go through st.cache_data, so identical profiles
+    # are memoized per session instead; only AI text is kept, so a failed
+    # call is retried on the next click
+    purpose_cache = st.session_state.setdefault("purpose_cache", {})
+    cache_key = (tuple(traits.items()), tuple(values), tuple(motivations))
+    placeholder = st.empty()
+    purpose_text = purpose_cache.get(cache_key)
+    if purpose_text is None:
+        placeholder.info("Generating your purpose statement...")
+        purpose_text, from_ai = generate_purpose_statement(traits, values, motivations, placeholder)
+        if from_ai:
+            purpose_cache[cache_key] = purpose_text
+    placeholder.write(purpose_text)
 
     st.subheader("🔍 Summary Snapshot")
-    df = pd.DataFrame(list(traits.items()), columns=["Trait", "Score"])
-    st.dataframe(df, use_container_width=True)
+    st.dataframe({"Trait": list(traits.keys()), "Score": list(traits.values())}, use_container_width=True)
 
     # Download results
     result_data = {
@@ -149,11 +186,52 @@ if st.button("✨ Discover My Purpose"):
 
     st.download_button(
         "📥 Download My Purpose Report (JSON)",
-        data=json.dumps(result_data, indent=2),
+        data=dumps(result_data),
         file_name="purpose_report.json",
         mime="application/json"
     )
 
+# -----------------------------
+# Cohort reports (optional, batch)
+# -----------------------------
+if use_ai:
+    with st.expander("👥 Cohort reports (classroom / team batch)"):
+        st.caption("Queue several profiles and generate all reports in one batch job (results within 24h).")
+        pending = st.session_state.setdefault("pending_profiles", [])
+        batch_ids = st.session_state.setdefault("cohort_batch_ids", [])
+        if st.button("Add current profile to cohort"):
+            # running counter keeps profile ids (batch custom_ids) unique across batches
+            st.session_state["cohort_profile_count"] = st.session_state.get("cohort_profile_count", 0) + 1
+            pending.append({
+                "id": f"profile-{st.session_state['cohort_profile_count']}",
+                "traits": _score_cached(tuple(sorted(responses.items()))),
+                "values": values,
+                "motivations": motivations
+            })
+        if pending and st.button("Submit cohort batch"):
+            try:
+                batch_ids.append(generate_purpose_statements_batch(pending))
+                st.session_state["pending_profiles"] = []
+                st.info(f"Batch submitted: {batch_ids[-1]}")
+            except Exception as e:
+                st.error(f"Batch submission failed: {e}")
+        # read after the submit handler so a just-submitted batch shows 0 queued
+        st.write(f"{len(st.session_state['pending_profiles'])} profile(s) queued")
+        if batch_ids:
+            batch_id = st.selectbox("Submitted batches", batch_ids, index=len(batch_ids) - 1)
+            if st.button("Check cohort batch"):
+                try:
+                    status, reports, errors = fetch_batch_results(batch_id)
+                except Exception as e:
+                    st.error(f"Batch lookup failed: {e}")
+                else:
+                    st.write(f"Status: {status}")
+                    for profile_id, text in (reports or {}).items():
+                        st.markdown(f"**{profile_id}**")
+                        st.write(text)
+                    for profile_id, error in (errors or {}).items():
+                        st.error(f"{profile_id}: {error}")
+
 st.divider()
 st.caption("Built with ❤️ using Streamlit & psychological insights. (c) 2025")
 
@@ -0,0 +1,119 @@
+# openai_helpers.py
+# Shared OpenAI configuration and helpers (JSON, streaming, Batch API) for the
+# PurposeFinder Streamlit scripts. Streamlit re-executes the entry scripts on
+# every rerun, but this module is imported once per process (cached in
+# sys.modules), so the environment is read a single time here.
+
+import functools
+import importlib.util
+import os
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+    import json
+
+OPENAI_API_KEY = os.getenv('OPENAI_API_KEY')
+HAS_API_KEY = bool(OPENAI_API_KEY)
+
+# The SDK itself is imported lazily on first use, keeping it off the
+# cold-start path of the first page render
+OPENAI_AVAILABLE = importlib.util.find_spec('openai') is not None
+
+
+def dumps(obj, indent=True):
+    # orjson handles numpy scalars/arrays natively; stdlib json is the fallback
+    if orjson is not None:
+        option = orjson.OPT_SERIALIZE_NUMPY | (orjson.OPT_INDENT_2 if indent else 0)
+        return orjson.dumps(obj, option=option).decode()
+    return json.dumps(obj, indent=2 if indent else None,
+                      default=lambda o: o.tolist() if hasattr(o, 'tolist') else str(o))
+
+
+def loads(text):
+    if orjson is not None:
+        return orjson.loads(text)
+    return json.loads(text)
+
+
+@functools.lru_cache(maxsize=None)
+def get_openai_client():
+    # one client (and HTTP connection pool) shared across reruns and sessions
+    from openai import OpenAI
+    return OpenAI(api_key=OPENAI_API_KEY)
+
+
+def render_stream(stream, placeholder=None):
+    # accumulate streamed deltas, redrawing the placeholder as tokens arrive;
+    # whatever the placeholder shows (e.g. a "Generating..." note) stays until
+    # the first non-empty delta
+    text = ''
+    for chunk in stream:
+        if chunk.choices and chunk.choices[0].delta.content:
+            text += chunk.choices[0].delta.content
+            if placeholder is not None:
+                placeholder.markdown(text + '▌')
+    if placeholder is not None:
+        placeholder.markdown(text)
+    return text.strip()
+
+
+def submit_batch(items, model='gpt-4o-mini', temperature=0.7, max_tokens=400):
+    # Queue many (custom_id, prompt) pairs as one OpenAI Batch API job (cheaper,
+    # higher throughput, results within 24h). Returns the batch id.
+    if not OPENAI_AVAILABLE:
+        raise RuntimeError('OpenAI library not installed')
+    if not HAS_API_KEY:
+        raise RuntimeError('OPENAI_API_KEY not set')
+    client = get_openai_client()
+    lines = [
+        dumps({
+            'custom_id': custom_id,
+            'method': 'POST',
+            'url': '/v1/chat/completions',
+            'body': {
+                'model': model,
+                'messages': [{"role": "user", "content": p}],
+                'temperature': temperature,
+                'max_tokens': max_tokens
+            }
+        }, indent=False)
+        for custom_id, p in items
+    ]
+    batch_file = client.files.create(
+        file=('purposefinder_batch.jsonl', '\n'.join(lines).encode()),
+        purpose='batch'
+    )
+    batch = client.batches.create(
+        input_file_id=batch_file.id,
+        endpoint='/v1/chat/completions',
+        completion_window='24h'
+    )
+    return batch.id
+
+
+def fetch_batch_results(batch_id):
+    # returns (status, {custom_id: text}, {custom_id: error message}); both
+    # dicts are None until the batch completes. Failed requests land in the
+    # error file, which may be the only file when every request failed.
+    client = get_openai_client()
+    batch = client.batches.retrieve(batch_id)
+    if batch.status != 'completed':
+        return batch.status, None, None
+    results, errors = {}, {}
+    for file_id in (batch.output_file_id, batch.error_file_id):
+        if not file_id:
+            continue
+        for line in client.files.content(file_id).text.splitlines():
+            if not line.strip():
+                continue
+            row = loads(line)
+            body = (row.get('response') or {}).get('body') or {}
+            choices = body.get('choices') or []
+            if choices:
+                results[row['custom_id']] = choices[0]['message']['content'].strip()
+            else:
+                error = row.get('error') or body.get('error') or {}
+                errors[row['custom_id']] = error.get('message') or 'Request failed'
+    return batch.status, results, errors
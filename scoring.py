@@ -0,0 +1,119 @@
+# scoring.py
+# Question bank and derived lookup structures for PurposeFinder.
+# Streamlit re-executes the entry script on every rerun, but an imported module
+# runs once per process (cached in sys.modules), so everything here is built a
+# single time and shared by all reruns and sessions.
+
+import functools
+import importlib.util
+
+import numpy as np
+
+# numba is optional and only imported when a large question bank needs it
+NUMBA_AVAILABLE = importlib.util.find_spec('numba') is not None
+
+# Short Big Five items (very reduced set for MVP). Responses 1-5
+BIG5_ITEMS = {
+    'Openness': [
+        "I enjoy trying new things and new experiences.",
+        "I prefer variety over routine."],
+    'Conscientiousness': [
+        "I pay attention to details and like to be organized.",
+        "I finish tasks I start."],
+    'Extraversion': [
+        "I feel energized spending time with other people.",
+        "I enjoy being the center of attention sometimes."],
+    'Agreeableness': [
+        "I usually consider other people's feelings.",
+        "I prefer cooperation over competition."],
+    'Neuroticism': [
+        "I sometimes feel anxious or stressed.",
+        "I get upset easily by small things."]
+}
+
+# Self-Determination (autonomy, competence, relatedness) -- short prompts
+SDT_ITEMS = {
+    'Autonomy': [
+        "I have the freedom to make choices about how I spend my time."],
+    'Competence': [
+        "I feel capable of achieving goals I set for myself."],
+    'Relatedness': [
+        "I feel connected to people who care about me."]
+}
+
+
+# Questions flattened into (trait, index-within-trait, text, widget key).
+# Position in the tuple is the stable integer question id used as the
+# response-dict key; rendering and scoring both iterate this single sequence.
+# Slider keys ("b5_0", "sdt_2", ...) are formatted here, once per process,
+# rather than by the render loop on every rerun.
+def _flatten_items(items_by_trait, key_prefix):
+    pairs = [(trait, i, text) for trait, items in items_by_trait.items() for i, text in enumerate(items)]
+    return tuple((trait, i, text, f"{key_prefix}_{qid}") for qid, (trait, i, text) in enumerate(pairs))
+
+
+BIG5_FLAT = _flatten_items(BIG5_ITEMS, 'b5')
+SDT_FLAT = _flatten_items(SDT_ITEMS, 'sdt')
+
+
+def _trait_index(items_by_trait, flat):
+    # {trait: array of question ids belonging to that trait}
+    return {trait: np.array([qid for qid, (t, *_) in enumerate(flat) if t == trait])
+            for trait in items_by_trait}
+
+
+BIG5_TRAIT_INDEX = _trait_index(BIG5_ITEMS, BIG5_FLAT)
+SDT_TRAIT_INDEX = _trait_index(SDT_ITEMS, SDT_FLAT)
+
+
+def _indicator_matrix(trait_index, n_items):
+    # trait x question-id 0/1 matrix, so scoring is a single matrix-vector
+    # product instead of one np.mean call per trait
+    M = np.zeros((len(trait_index), n_items))
+    for t, qids in enumerate(trait_index.values()):
+        M[t, qids] = 1
+    return M, M.sum(axis=1)
+
+
+BIG5_MATRIX, BIG5_COUNTS = _indicator_matrix(BIG5_TRAIT_INDEX, len(BIG5_FLAT))
+SDT_MATRIX, SDT_COUNTS = _indicator_matrix(SDT_TRAIT_INDEX, len(SDT_FLAT))
+
+# Below this many items the JIT compile/load cost outweighs any scoring gain
+NUMBA_MIN_ITEMS = 50
+
+
+def _score_kernel(resp, M, counts):
+    out = np.empty(M.shape[0])
+    for t in range(M.shape[0]):
+        s = 0.0
+        for i in range(resp.shape[0]):
+            s += M[t, i] * resp[i]
+        out[t] = s / counts[t]
+    return out
+
+
+@functools.lru_cache(maxsize=None)
+def _jit_score_kernel():
+    from numba import njit
+    # cache=True persists the compiled kernel on disk across reruns/restarts
+    return njit(cache=True, fastmath=True)(_score_kernel)
+
+
+def _score_vector(v, M, counts):
+    if NUMBA_AVAILABLE and v.shape[0] > NUMBA_MIN_ITEMS:
+        return _jit_score_kernel()(v, M, counts)
+    return (M @ v) / counts
+
+
+def score_likert_responses(responses):
+    # responses: dict of {question_id: int}, ids index BIG5_FLAT
+    # For big five: average per trait
+    v = np.fromiter((responses.get(qid, 3) for qid in range(len(BIG5_FLAT))), dtype=float, count=len(BIG5_FLAT))
+    scores = _score_vector(v, BIG5_MATRIX, BIG5_COUNTS)
+    return dict(zip(BIG5_ITEMS, scores.tolist()))
+
+
+def score_sdt(responses):
+    v = np.fromiter((responses.get(qid, 3) for qid in range(len(SDT_FLAT))), dtype=float, count=len(SDT_FLAT))
+    scores = _score_vector(v, SDT_MATRIX, SDT_COUNTS)
+    return dict(zip(SDT_ITEMS, scores.tolist()))